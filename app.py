@@ -1,5 +1,6 @@
 import os
 import base64
+import click
 import io
 import numpy as np
 import cv2
@@ -230,6 +231,53 @@ def get_stats():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/api/reports/percentage/<roll_number>')
+def student_percentage(roll_number):
+    try:
+        month = request.args.get('month')
+        if month:
+            try:
+                month = datetime.strptime(month, '%Y-%m').strftime('%Y-%m')
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Month must be in YYYY-MM format!'})
+
+        subjects = db.get_student_percentages(roll_number.strip().upper(), month)
+
+        if subjects is None:
+            return jsonify({'success': False, 'message': 'Student not found!'})
+
+        return jsonify({'success': True, 'roll_number': roll_number.strip().upper(), 'subjects': subjects})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/api/reports/defaulters')
+def defaulters():
+    try:
+        branch = request.args.get('branch', '').strip().upper()
+        section = request.args.get('section', '').strip().upper()
+        subject = request.args.get('subject') or None
+        threshold = float(request.args.get('threshold', 75))
+
+        if not branch or not section:
+            return jsonify({'success': False, 'message': 'Branch and section are required!'})
+
+        records = db.get_defaulters(branch, section, threshold, subject)
+
+        return jsonify({
+            'success': True,
+            'threshold': threshold,
+            'count': len(records),
+            'defaulters': records
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the attendance rollup tables from the raw attendance log."""
+    student_rows, section_rows = db.rebuild_rollups()
+    click.echo(f"Rebuilt {student_rows} student-month and {section_rows} section-day rollup rows.")
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=os.environ.get('DEBUG', 'False').lower() == 'true')
@@ -44,6 +44,36 @@ class Database:
                     status VARCHAR(20) DEFAULT 'Present'
                 )
             ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance_marks (
+                    roll_number VARCHAR(50) NOT NULL,
+                    subject VARCHAR(100) NOT NULL,
+                    day VARCHAR(10) NOT NULL,
+                    PRIMARY KEY (roll_number, subject, day)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance_student_monthly (
+                    roll_number VARCHAR(50) NOT NULL,
+                    subject VARCHAR(100) NOT NULL,
+                    month VARCHAR(7) NOT NULL,
+                    present_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (roll_number, subject, month)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance_section_daily (
+                    branch VARCHAR(50) NOT NULL,
+                    section VARCHAR(10) NOT NULL,
+                    subject VARCHAR(100) NOT NULL,
+                    day VARCHAR(10) NOT NULL,
+                    present_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (branch, section, subject, day)
+                )
+            ''')
         else:
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS students (
@@ -69,6 +99,36 @@ class Database:
                 )
             ''')
 
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance_marks (
+                    roll_number TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    PRIMARY KEY (roll_number, subject, day)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance_student_monthly (
+                    roll_number TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    present_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (roll_number, subject, month)
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS attendance_section_daily (
+                    branch TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    subject TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    present_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (branch, section, subject, day)
+                )
+            ''')
+
         conn.commit()
         conn.close()
 
@@ -128,38 +188,266 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
 
-        today = datetime.now().strftime('%Y-%m-%d')
+        # Stamp the row here so the rollup day and the stored timestamp come from the same clock
+        now = datetime.now()
+        timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+        today = now.strftime('%Y-%m-%d')
 
+        # The marker's primary key makes the once-per-day check atomic, so concurrent
+        # recognitions of the same student cannot both insert and double-count the rollups
         if self.is_postgres:
             cursor.execute('''
-                SELECT id FROM attendance 
-                WHERE roll_number = %s AND DATE(timestamp) = %s AND subject = %s
-            ''', (roll_number, today, subject))
+                INSERT INTO attendance_marks (roll_number, subject, day)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (roll_number, subject, day) DO NOTHING
+            ''', (roll_number, subject, today))
         else:
             cursor.execute('''
-                SELECT id FROM attendance 
-                WHERE roll_number = ? AND date(timestamp) = ? AND subject = ?
-            ''', (roll_number, today, subject))
+                INSERT INTO attendance_marks (roll_number, subject, day)
+                VALUES (?, ?, ?)
+                ON CONFLICT (roll_number, subject, day) DO NOTHING
+            ''', (roll_number, subject, today))
 
-        if cursor.fetchone():
+        if cursor.rowcount == 0:
+            conn.rollback()
             conn.close()
             return False, "Already marked present today!"
 
         if self.is_postgres:
             cursor.execute('''
-                INSERT INTO attendance (roll_number, name, subject)
-                VALUES (%s, %s, %s)
-            ''', (roll_number, name, subject))
+                INSERT INTO attendance (roll_number, name, subject, timestamp)
+                VALUES (%s, %s, %s, %s)
+            ''', (roll_number, name, subject, timestamp))
         else:
             cursor.execute('''
-                INSERT INTO attendance (roll_number, name, subject)
-                VALUES (?, ?, ?)
-            ''', (roll_number, name, subject))
+                INSERT INTO attendance (roll_number, name, subject, timestamp)
+                VALUES (?, ?, ?, ?)
+            ''', (roll_number, name, subject, timestamp))
+
+        self._update_rollups(cursor, roll_number, subject, today)
 
         conn.commit()
         conn.close()
         return True, "Attendance marked successfully!"
 
+    def _update_rollups(self, cursor, roll_number, subject, day):
+        # Runs on the caller's cursor so the rollups commit together with the raw attendance row
+        month = day[:7]
+
+        if self.is_postgres:
+            cursor.execute('''
+                INSERT INTO attendance_student_monthly (roll_number, subject, month, present_count)
+                VALUES (%s, %s, %s, 1)
+                ON CONFLICT (roll_number, subject, month)
+                DO UPDATE SET present_count = attendance_student_monthly.present_count + 1
+            ''', (roll_number, subject, month))
+            cursor.execute('SELECT branch, section FROM students WHERE roll_number = %s', (roll_number,))
+        else:
+            cursor.execute('''
+                INSERT INTO attendance_student_monthly (roll_number, subject, month, present_count)
+                VALUES (?, ?, ?, 1)
+                ON CONFLICT (roll_number, subject, month)
+                DO UPDATE SET present_count = present_count + 1
+            ''', (roll_number, subject, month))
+            cursor.execute('SELECT branch, section FROM students WHERE roll_number = ?', (roll_number,))
+
+        student = cursor.fetchone()
+        if not student:
+            return
+
+        if self.is_postgres:
+            cursor.execute('''
+                INSERT INTO attendance_section_daily (branch, section, subject, day, present_count)
+                VALUES (%s, %s, %s, %s, 1)
+                ON CONFLICT (branch, section, subject, day)
+                DO UPDATE SET present_count = attendance_section_daily.present_count + 1
+            ''', (student[0], student[1], subject, day))
+        else:
+            cursor.execute('''
+                INSERT INTO attendance_section_daily (branch, section, subject, day, present_count)
+                VALUES (?, ?, ?, ?, 1)
+                ON CONFLICT (branch, section, subject, day)
+                DO UPDATE SET present_count = present_count + 1
+            ''', (student[0], student[1], subject, day))
+
+    def rebuild_rollups(self):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if self.is_postgres:
+            # Block mark_attendance until the rebuild commits so no mark falls between snapshot and swap
+            cursor.execute('''
+                LOCK TABLE attendance_marks, attendance, attendance_student_monthly, attendance_section_daily
+                IN SHARE ROW EXCLUSIVE MODE
+            ''')
+
+        cursor.execute('DELETE FROM attendance_marks')
+        cursor.execute('DELETE FROM attendance_student_monthly')
+        cursor.execute('DELETE FROM attendance_section_daily')
+
+        if self.is_postgres:
+            day_expr = "TO_CHAR(timestamp, 'YYYY-MM-DD')"
+            month_expr = "SUBSTRING(m.day FROM 1 FOR 7)"
+        else:
+            day_expr = "date(timestamp)"
+            month_expr = "substr(m.day, 1, 7)"
+
+        # Rollups are counted from the deduplicated markers, exactly as mark_attendance bumps them
+        cursor.execute(f'''
+            INSERT INTO attendance_marks (roll_number, subject, day)
+            SELECT DISTINCT roll_number, subject, {day_expr}
+            FROM attendance
+        ''')
+
+        cursor.execute(f'''
+            INSERT INTO attendance_student_monthly (roll_number, subject, month, present_count)
+            SELECT m.roll_number, m.subject, {month_expr}, COUNT(*)
+            FROM attendance_marks m
+            GROUP BY m.roll_number, m.subject, {month_expr}
+        ''')
+
+        cursor.execute('''
+            INSERT INTO attendance_section_daily (branch, section, subject, day, present_count)
+            SELECT s.branch, s.section, m.subject, m.day, COUNT(*)
+            FROM attendance_marks m
+            JOIN students s ON s.roll_number = m.roll_number
+            GROUP BY s.branch, s.section, m.subject, m.day
+        ''')
+
+        cursor.execute('SELECT COUNT(*) FROM attendance_student_monthly')
+        student_rows = cursor.fetchone()[0]
+        cursor.execute('SELECT COUNT(*) FROM attendance_section_daily')
+        section_rows = cursor.fetchone()[0]
+
+        conn.commit()
+        conn.close()
+        return student_rows, section_rows
+
+    def _attendance_percentage(self, present, held):
+        # Held comes from the student's current section, so marks made before a section
+        # change can exceed it; cap rather than report more than 100%
+        return round(100.0 * min(present, held) / held, 2)
+
+    def get_student_percentages(self, roll_number, month=None):
+        # A class counts as held on any day the student's section has at least one attendee
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if self.is_postgres:
+            cursor.execute('SELECT branch, section FROM students WHERE roll_number = %s', (roll_number,))
+        else:
+            cursor.execute('SELECT branch, section FROM students WHERE roll_number = ?', (roll_number,))
+
+        student = cursor.fetchone()
+        if not student:
+            conn.close()
+            return None
+
+        first_day, last_day = (f'{month}-01', f'{month}-31') if month else ('0000-00-00', '9999-99-99')
+        first_month, last_month = (month, month) if month else ('0000-00', '9999-99')
+
+        if self.is_postgres:
+            cursor.execute('''
+                SELECT d.subject, d.held, COALESCE(m.present, 0)
+                FROM (
+                    SELECT subject, COUNT(*) AS held FROM attendance_section_daily
+                    WHERE branch = %s AND section = %s AND day BETWEEN %s AND %s
+                    GROUP BY subject
+                ) d
+                LEFT JOIN (
+                    SELECT subject, SUM(present_count) AS present FROM attendance_student_monthly
+                    WHERE roll_number = %s AND month BETWEEN %s AND %s
+                    GROUP BY subject
+                ) m ON m.subject = d.subject
+                ORDER BY d.subject
+            ''', (student[0], student[1], first_day, last_day, roll_number, first_month, last_month))
+        else:
+            cursor.execute('''
+                SELECT d.subject, d.held, COALESCE(m.present, 0)
+                FROM (
+                    SELECT subject, COUNT(*) AS held FROM attendance_section_daily
+                    WHERE branch = ? AND section = ? AND day BETWEEN ? AND ?
+                    GROUP BY subject
+                ) d
+                LEFT JOIN (
+                    SELECT subject, SUM(present_count) AS present FROM attendance_student_monthly
+                    WHERE roll_number = ? AND month BETWEEN ? AND ?
+                    GROUP BY subject
+                ) m ON m.subject = d.subject
+                ORDER BY d.subject
+            ''', (student[0], student[1], first_day, last_day, roll_number, first_month, last_month))
+
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [{
+            'subject': row[0],
+            'held': row[1],
+            'present': row[2],
+            'percentage': self._attendance_percentage(row[2], row[1])
+        } for row in rows]
+
+    def get_defaulters(self, branch, section, threshold=75.0, subject=None):
+        conn = self.get_connection()
+        cursor = conn.cursor()
+
+        if self.is_postgres:
+            cursor.execute('''
+                SELECT s.roll_number, s.name, d.subject, d.held, COALESCE(m.present, 0)
+                FROM students s
+                JOIN (
+                    SELECT subject, COUNT(*) AS held FROM attendance_section_daily
+                    WHERE branch = %s AND section = %s AND (%s IS NULL OR subject = %s)
+                    GROUP BY subject
+                ) d ON TRUE
+                LEFT JOIN (
+                    SELECT m.roll_number, m.subject, SUM(m.present_count) AS present
+                    FROM attendance_student_monthly m
+                    JOIN students st ON st.roll_number = m.roll_number
+                    WHERE st.branch = %s AND st.section = %s AND (%s IS NULL OR m.subject = %s)
+                    GROUP BY m.roll_number, m.subject
+                ) m ON m.roll_number = s.roll_number AND m.subject = d.subject
+                WHERE s.branch = %s AND s.section = %s
+                ORDER BY s.roll_number, d.subject
+            ''', (branch, section, subject, subject, branch, section, subject, subject, branch, section))
+        else:
+            cursor.execute('''
+                SELECT s.roll_number, s.name, d.subject, d.held, COALESCE(m.present, 0)
+                FROM students s
+                JOIN (
+                    SELECT subject, COUNT(*) AS held FROM attendance_section_daily
+                    WHERE branch = ? AND section = ? AND (? IS NULL OR subject = ?)
+                    GROUP BY subject
+                ) d ON 1 = 1
+                LEFT JOIN (
+                    SELECT m.roll_number, m.subject, SUM(m.present_count) AS present
+                    FROM attendance_student_monthly m
+                    JOIN students st ON st.roll_number = m.roll_number
+                    WHERE st.branch = ? AND st.section = ? AND (? IS NULL OR m.subject = ?)
+                    GROUP BY m.roll_number, m.subject
+                ) m ON m.roll_number = s.roll_number AND m.subject = d.subject
+                WHERE s.branch = ? AND s.section = ?
+                ORDER BY s.roll_number, d.subject
+            ''', (branch, section, subject, subject, branch, section, subject, subject, branch, section))
+
+        rows = cursor.fetchall()
+        conn.close()
+
+        defaulters = []
+        for row in rows:
+            percentage = self._attendance_percentage(row[4], row[3])
+            if percentage < threshold:
+                defaulters.append({
+                    'roll_number': row[0],
+                    'name': row[1],
+                    'subject': row[2],
+                    'held': row[3],
+                    'present': row[4],
+                    'percentage': percentage
+                })
+
+        return defaulters
+
     def get_attendance_report(self, date=None):
         conn = self.get_connection()
         cursor = conn.cursor()